@@ -1,10 +1,117 @@
-import getopt, sys
-import datetime
+import argparse, math, os, struct, sys, time
+from array import array
 
 # Valores globales a emplear en las funciones (Taken, Not taken)
 T = True
 N = False
 
+# Encabezado del archivo de telemetría por ventanas (--telemetry)
+MAGIC_TELEMETRIA = b"BPW1"
+
+# Encabezado del formato binario de traces (subcomando convert)
+MAGIC_TRACE = b"BPT2"
+
+# Subcomandos de la línea de comandos, simulate es el comando por defecto
+SUBCOMANDOS = ("simulate", "sample", "sweep", "search", "convert", "stats", "results", "telemetry", "bench")
+
+# Nombres de los predictores según el argumento -bp
+NOMBRES_PREDICTORES = ("Bimodal", "Pshare", "Gshare", "Tournament")
+
+# Exponente máximo del BHT, tablas más grandes no caben en memoria
+S_MAXIMO = 30
+
+# Tiempo máximo aceptado (mediana) para el arranque en frío, en milisegundos
+OBJETIVO_ARRANQUE_MS = 100
+
+
+class TablaHistorias:
+    def __init__(self, entradas, largo, s, plegar=False):
+        """Constructor de una tabla de registros de historia
+
+        Cada registro mantiene una vista de s bits lista para indexar el BHT,
+        por lo que insertar un resultado es O(1) sin importar el tamaño de la
+        historia. Solo al plegar una historia más larga que s hace falta saber
+        qué bit sale de ella; en ese caso los largo bits se guardan empacados
+        en un bytearray como un buffer circular.
+
+        Parameters
+        ----------
+        entradas : int
+            Cantidad de registros (1 para el registro global)
+        largo : int
+            Tamaño de cada registro en bits
+        s : int
+            El exponente del tamaño del BHT (2^s)
+        plegar : bool
+            Si es True la vista es el XOR de todos los bloques de s bits de la
+            historia (folded history). Si es False la vista son los ultimos
+            s bits, como en los predictores originales.
+
+        """
+
+        self.entradas = entradas
+        self.largo = largo
+        self.s = s
+        self.plegar = plegar and largo > s
+
+        # Sin plegar, los bits más allá de la vista nunca afectan el índice
+        self.bytes_por_registro = (largo + 7) // 8 if self.plegar else 0
+        self.bits = bytearray(entradas * self.bytes_por_registro)
+        self.posiciones = [0 for i in range(entradas)] if self.bytes_por_registro else []
+
+        # La vista de cada registro y su máscara
+        self.vistas = [0 for i in range(entradas)]
+        self.mascara_vista = (1 << min(largo, s)) - 1
+        # Posición en la que el bit más viejo cae dentro de la vista plegada
+        self.desplazamiento_saliente = largo % s if s else 0
+
+    def indice(self, entrada):
+        """Vista de s bits del registro, para indexar el BHT
+
+        Parameters
+        ----------
+        entrada : int
+            Registro a consultar
+
+        Returns
+        ------
+        vista : int
+            Ultimos s bits de la historia, o la historia plegada a s bits
+
+        """
+
+        return self.vistas[entrada]
+
+    def insertar(self, entrada, resultado):
+        """Desplaza el registro e inserta el resultado del salto
+
+        Parameters
+        ----------
+        entrada : int
+            Registro a actualizar
+        resultado : bool
+            Es True si el salto fue tomado, False en caso contrario.
+
+        """
+
+        vista = (self.vistas[entrada] << 1) | resultado
+
+        if self.plegar:
+            # El buffer circular sobrescribe el bit más viejo con el nuevo
+            posicion = self.posiciones[entrada]
+            byte = entrada * self.bytes_por_registro + (posicion >> 3)
+            bit = posicion & 7
+            saliente = (self.bits[byte] >> bit) & 1
+            self.bits[byte] = (self.bits[byte] & ~(1 << bit)) | (resultado << bit)
+
+            posicion += 1
+            self.posiciones[entrada] = posicion if posicion < self.largo else 0
+
+            # El bit que sale de la historia se quita de la vista plegada
+            vista ^= saliente << self.desplazamiento_saliente
+            vista ^= vista >> self.s
+
+        self.vistas[entrada] = vista & self.mascara_vista
 
 class Bimodal:
     def __init__(self, s):
@@ -91,7 +198,7 @@ class Bimodal:
         return prediccion
 
 class Pshare:
-    def __init__(self, s, ph):
+    def __init__(self, s, ph, plegar=False):
         """Constructor del predictor privado
 
         Parameters
@@ -100,25 +207,17 @@ class Pshare:
             El exponente del tamaño del BHT (2^s)
         ph : int
             Tamaño de los registros del PHT
+        plegar : bool
+            Si es True los registros más largos que s se pliegan para indexar el BHT
         
         """
         self.s = s
         self.ph = ph
         numero_entradas = pow(2, s)
         # Se define el PHT y el BHT para el predictor privado
-        self.pht = [0 for i in range(numero_entradas)]
+        self.pht = TablaHistorias(numero_entradas, ph, s, plegar)
         self.bht = [[N,N] for i in range(numero_entradas)]
 
-        # Se crea una máscara de n o s cantidad de unos
-        self.n_mask = "0b"
-        for i in range(s):
-            self.n_mask+="1"
-
-        # Se crea una máscara de ph cantidad de unos
-        self.ph_mask = "0b"
-        for i in range(ph):
-            self.ph_mask+="1"
-
     def prediccion(self, pc_actual, resultado_actual):
         """Función principal del predictor Pshare
 
@@ -140,15 +239,8 @@ class Pshare:
 
         """
 
-        self.pht[pc_actual] = self.pht[pc_actual] & int(self.ph_mask, 2)
-
-        # Se aplica el XOR del PC con el registro de historia
-        xor = pc_actual ^ self.pht[pc_actual]
-
-        # Se toman los ultimos n bits
-        xor = xor & int(self.n_mask,2)
-
-        index_bht_actual = xor
+        # Se aplica el XOR del PC con el registro de historia (ya recortado a s bits)
+        index_bht_actual = pc_actual ^ self.pht.indice(pc_actual)
         
         contador_actual = self.bht[index_bht_actual]
         
@@ -161,8 +253,7 @@ class Pshare:
             # Si el branch fue Taken el contador es [N, -]
             if resultado_actual:
                 # Como fue Taken se actualiza el registro de historia  
-                self.pht[pc_actual] = self.pht[pc_actual] << 1
-                self.pht[pc_actual] += 1
+                self.pht.insertar(pc_actual, T)
                 #Si el contador es [N,T]
                 if contador_actual[1]:
                     # Pasa a [T,N]
@@ -175,7 +266,7 @@ class Pshare:
             # Si el branch fue Not taken el contador es [T, -]
             else:
                 # Como fue Not taken se actualiza el registro de historia  
-                self.pht[pc_actual] = self.pht[pc_actual] << 1
+                self.pht.insertar(pc_actual, N)
                 #Si el contador es [T,T]
                 if contador_actual[1]:
                     # Pasa a [T,N]
@@ -192,8 +283,7 @@ class Pshare:
             # Si el branch fue Taken el contador es [T, -]
             if resultado_actual:
                 # Como fue Taken se actualiza el registro de historia  
-                self.pht[pc_actual] = self.pht[pc_actual] << 1
-                self.pht[pc_actual] += 1
+                self.pht.insertar(pc_actual, T)
                 #Si el contador es [T,N]
                 if not contador_actual[1]:
                     # Pasa a [T,T]
@@ -201,7 +291,7 @@ class Pshare:
             # Si el branch fue Not taken el contador es [N, -]
             else:
                 # Como fue Not taken se actualiza el registro de historia  
-                self.pht[pc_actual] = self.pht[pc_actual] << 1
+                self.pht.insertar(pc_actual, N)
                 #Si el contador es [N,T]
                 if contador_actual[1]:
                     # Pasa a [N,N]
@@ -209,7 +299,7 @@ class Pshare:
         return prediccion
 
 class Gshare:
-    def __init__(self, s, gh):
+    def __init__(self, s, gh, plegar=False):
         """Constructor del predictor global
 
         Parameters
@@ -218,26 +308,18 @@ class Gshare:
             El exponente del tamaño del BHT (2^s)
         gh : int
             Tamaño del registro global
+        plegar : bool
+            Si es True un registro más largo que s se pliega para indexar el BHT
         
         """
 
         self.s = s
         self.gh = gh
         numero_entradas = pow(2, s)
-        # Se define el registro de historia y el BHT para el predictor global
-        self.registro_historia = 0
+        # Se define el registro de historia (una tabla de una sola entrada) y el BHT para el predictor global
+        self.registro_historia = TablaHistorias(1, gh, s, plegar)
         self.bht = [[N,N] for i in range(numero_entradas)]
 
-        # Se crea una máscara de n o s cantidad de unos
-        self.n_mask = "0b"
-        for i in range(s):
-            self.n_mask+="1"
-
-        # Se crea una máscara de gh cantidad de unos
-        self.gh_mask = "0b"
-        for i in range(gh):
-            self.gh_mask+="1"
-
     def prediccion(self, pc_actual, resultado_actual):
         """Función principal del predictor Gshare
 
@@ -258,15 +340,8 @@ class Gshare:
 
         """
 
-        self.registro_historia = self.registro_historia & int(self.gh_mask, 2)
-
-        # Se aplica el XOR del PC con el registro de historia
-        xor = pc_actual ^ self.registro_historia
-
-        # Se toman los ultimos n bits
-        xor = xor & int(self.n_mask,2)
-
-        index_bht_actual = xor
+        # Se aplica el XOR del PC con el registro de historia (ya recortado a s bits)
+        index_bht_actual = pc_actual ^ self.registro_historia.indice(0)
         
         contador_actual = self.bht[index_bht_actual]
         
@@ -279,8 +354,7 @@ class Gshare:
             # Si el branch fue Taken el contador es [N, -]
             if resultado_actual:
                 # Como fue Taken se actualiza el registro de historia  
-                self.registro_historia = self.registro_historia << 1
-                self.registro_historia += 1
+                self.registro_historia.insertar(0, T)
                 #Si el contador es [N,T]
                 if contador_actual[1]:
                     # Pasa a [T,N]
@@ -293,7 +367,7 @@ class Gshare:
             # Si el branch fue Not taken el contador es [T, -]
             else:
                 # Como fue Not taken se actualiza el registro de historia  
-                self.registro_historia = self.registro_historia << 1
+                self.registro_historia.insertar(0, N)
                 #Si el contador es [T,T]
                 if contador_actual[1]:
                     # Pasa a [T,N]
@@ -310,8 +384,7 @@ class Gshare:
              # Si el branch fue Taken el contador es [T, -]
             if resultado_actual:
                 # Como fue Taken se actualiza el registro de historia  
-                self.registro_historia = self.registro_historia << 1
-                self.registro_historia += 1
+                self.registro_historia.insertar(0, T)
                 #Si el contador es [T,N]
                 if not contador_actual[1]:
                     # Pasa a [T,T]
@@ -319,7 +392,7 @@ class Gshare:
             # Si el branch fue Not taken el contador es [N, -]
             else:
                 # Como fue Not taken se actualiza el registro de historia  
-                self.registro_historia = self.registro_historia << 1
+                self.registro_historia.insertar(0, N)
                 #Si el contador es [N,T]
                 if contador_actual[1]:
                     # Pasa a [N,N]
@@ -328,7 +401,7 @@ class Gshare:
         return prediccion
 
 class Torneo:
-    def __init__(self, s, gh, ph):
+    def __init__(self, s, gh, ph, plegar=False):
         """Constructor del predictor por torneo
 
         Parameters
@@ -339,6 +412,8 @@ class Torneo:
             Tamaño del registro global del predictor global
         ph : int
             Tamaño de los registros del PHT del predictor privado
+        plegar : bool
+            Si es True las historias más largas que s se pliegan para indexar los BHT
         
         """
 
@@ -350,8 +425,8 @@ class Torneo:
         # Se codifica [T, T] como strongly prefer gshared
         self.metapredictor = [[N,N] for i in range(numero_entradas)]
 
-        self.predictor_privado = Pshare(s, ph) 
-        self.predictor_global = Gshare(s, gh) 
+        self.predictor_privado = Pshare(s, ph, plegar)
+        self.predictor_global = Gshare(s, gh, plegar)
 
     def prediccion(self, pc_actual, resultado_actual):
         """Función principal del predictor por Torneo
@@ -428,301 +503,1272 @@ class Torneo:
 
         return prediccion
 
+class EscritorTelemetria:
+    def __init__(self, archivo, ventana, columnas, bloque=16):
+        """Constructor del escritor de telemetría por ventanas
 
-def procesador_traces(s):
-    """Función que procesa el archivo con los traces
+        El archivo es columnar: después del encabezado se escriben bloques
+        de hasta bloque ventanas, cada uno con la cantidad de filas (uint32)
+        seguida de cada columna completa como uint32 little endian. Cada
+        bloque se escribe y se vacía al disco apenas se llena, de modo que
+        el archivo se puede leer con leer_telemetria mientras la simulación
+        sigue corriendo.
+
+        Parameters
+        ----------
+        archivo : str
+            Ruta del archivo de salida
+        ventana : int
+            Cantidad de saltos por ventana
+        columnas : lista de strings
+            Nombres de las columnas de cada fila
+        bloque : int
+            Cantidad de ventanas por bloque
+
+        """
+
+        self.ventana = ventana
+        self.columnas = columnas
+        self.bloque = bloque
+        self.filas = []
+
+        nombres = ",".join(columnas).encode()
+        self.file = open(archivo, "wb")
+        self.file.write(MAGIC_TELEMETRIA + struct.pack("<IH", ventana, len(nombres)) + nombres)
+        self.file.flush()
+
+    def agregar(self, fila):
+        """Agrega los contadores de una ventana
+
+        Parameters
+        ----------
+        fila : lista de ints
+            Un valor por columna
+
+        """
+
+        self.filas.append(fila)
+        if len(self.filas) >= self.bloque:
+            self.escribir_bloque()
+
+    def escribir_bloque(self):
+        """Escribe las filas pendientes como un bloque columnar"""
+
+        if not self.filas:
+            return
+
+        self.file.write(struct.pack("<I", len(self.filas)))
+        for columna in zip(*self.filas):
+            valores = array("I", columna)
+            if sys.byteorder == "big":
+                valores.byteswap()
+            self.file.write(valores.tobytes())
+        self.file.flush()
+        self.filas = []
+
+    def cerrar(self):
+        """Escribe las filas pendientes y cierra el archivo"""
+
+        self.escribir_bloque()
+        self.file.close()
 
-    Lee el archivo que recibe en el standard input y separa tanto los valores
-    de los PCs como los resultados en listas.
+
+def leer_entrada(archivo=None):
+    """Lee el contenido crudo de los traces
+
+    Si no se indica un archivo se lee el standard input. Los archivos
+    terminados en .gz se descomprimen directamente.
 
     Parameters
     ----------
-    s : int
-        El exponente del tamaño del BHT (2^s)
+    archivo : str
+        Ruta del archivo con los traces. Si es None o "-" se usa el standard input
 
     Returns
     ------
-    pcs : lista de ints (bin)
-        Cada entrada tiene los ultimos s bits de los PCs
+    datos : bytes
+        Contenido del archivo sin procesar
+
+    """
+
+    if archivo is None or archivo == "-":
+        return sys.stdin.buffer.read()
+
+    if archivo.endswith(".gz"):
+        # gzip solo se importa cuando realmente se necesita
+        import gzip
+        with gzip.open(archivo, "rb") as file:
+            return file.read()
+
+    with open(archivo, "rb") as file:
+        return file.read()
+
+def decodificar_traces(datos, archivo=None):
+    """Separa los PCs y los resultados de los traces
+
+    Los PCs se codifican con un diccionario: cada PC distinto recibe un id
+    (uint32) y se guarda una sola vez en la tabla de PCs. Acepta tanto el
+    formato de texto original ("PC T/N" por línea) como el formato binario
+    que genera el subcomando convert.
+
+    Parameters
+    ----------
+    datos : bytes
+        Contenido del archivo con los traces
+    archivo : str
+        Ruta de la cual se leyeron los datos, solo para reportar errores
+
+    Returns
+    ------
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
     resultados : lista de bools
         Son True si el salto fue tomado y False en caso contrario
-    pcs_completos : lista de ints (bin)
-        Cada entrada tiene todos los bits de los PCs
 
     """
-    
-    # Lee el standard input que corresponde a los traces del archivo
-    raw_traces = sys.stdin.read()
-    x = raw_traces.split("\n")
 
-    pcs = []
-    pcs_completos = []
+    if datos.startswith(MAGIC_TRACE):
+        return decodificar_traces_binarios(datos, archivo)
+
+    ids_pcs = array("I")
+    tabla_pcs = []
     resultados = []
 
+    # El texto del PC se convierte a int solo la primera vez que aparece
+    ids_por_texto = {}
+    ids_por_valor = {}
+
     # Separa el PC y el resultado del branch en dos listas separadas
-    for i in range(len(x) - 1):
-        trace = x[i]
-        pc = trace.split(" ")[0]
-        resultado = trace.split(" ")[1]
+    for trace in datos.decode().splitlines():
+        if not trace:
+            continue
+        pc, resultado = trace.split(" ")[:2]
 
-        pc = bin(int(pc))
-        pcs_completos.append(pc)
+        id_pc = ids_por_texto.get(pc)
+        if id_pc is None:
+            valor = int(pc)
+            id_pc = ids_por_valor.get(valor)
+            if id_pc is None:
+                id_pc = len(tabla_pcs)
+                ids_por_valor[valor] = id_pc
+                tabla_pcs.append(valor)
+            ids_por_texto[pc] = id_pc
 
-        pc = pc[len(pc) - s:]
-        pc = int(pc, 2)
+        ids_pcs.append(id_pc)
+        resultados.append(resultado == 'T')
 
-        if resultado == 'T':
-            resultado = T
-        else:
-            resultado = N
+    return ids_pcs, tabla_pcs, resultados
 
-        pcs.append(pc)
-        resultados.append(resultado)
-    return pcs, resultados, pcs_completos
+def decodificar_traces_binarios(datos, archivo=None):
+    """Lee los traces en el formato binario del subcomando convert
 
-def procesador_argumentos():
-    """Función que procesa los argumentos pasados en la terminal
+    Ver convertir_traces para el formato. Lanza ValueError si el largo del
+    archivo no concuerda con las cantidades del encabezado (por ejemplo,
+    un archivo truncado).
 
-    Utiliza la biblioteca getopt para procesar los argumentos.
-    Esta biblioteca casi que automatiza el proceso. Solo hay que indicarle
-    los argumentos a emplear tanto en su forma corta como la larga y donde guardar
-    cada valor.
+    Parameters
+    ----------
+    datos : bytes
+        Contenido del archivo binario
+    archivo : str
+        Ruta de la cual se leyeron los datos, solo para reportar errores
 
     Returns
     ------
-    valores_de_argumentos : lista de strings
-        Posee los valores de los argumentos: -s, -bp, -ph, -gh, -o
-
-    """
-
-    # Obtiene todos los argumentos de la línea de comandos
-    full_cmd_arguments = sys.argv
-
-    # Mantiene todos excepto el primero (nombre del archivo)
-    argument_list = full_cmd_arguments[1:]
-
-    # getopt no acepta argumentos cortos de mas de una letra, hay que improvisar
-    if "-bp" in argument_list:
-        argument_list[argument_list.index("-bp")] = "-b"
-    if "-gh" in argument_list:
-        argument_list[argument_list.index("-gh")] = "-g"
-    if "-ph" in argument_list:
-        argument_list[argument_list.index("-ph")] = "-p"
-
-    short_options = "s:b:g:p:o:"
-    long_options = ["size=", "branchpredictor=", "globalhistory=", "privatehistory=", "output="]
-
-    try:
-        arguments, values = getopt.getopt(argument_list, short_options, long_options)
-    except getopt.error as err:
-        # Error de agumentos
-        print (str(err))
-        sys.exit(2)
-
-    # Valores iniciales de los argumentos
-    s = 0
-    bp = 0
-    gh = 0
-    ph = 0
-    o = 0
-
-    # Evaluate given options
-    for current_argument, current_value in arguments:
-        if current_argument in ("-s", "--size"):
-            s = current_value
-        elif current_argument in ("-b", "--branchpredictor"):
-            bp = current_value
-        elif current_argument in ("-g", "--globalhistory"):
-            gh = current_value
-        elif current_argument in ("-p", "--privatehistory"):
-            ph = current_value
-        elif current_argument in ("-o", "--output"):
-            o = current_value
-        
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
+    resultados : lista de bools
+        Son True si el salto fue tomado y False en caso contrario
 
-    valores_argumentos = [s, bp, gh, ph, o]
+    """
 
-    return valores_argumentos
+    def leer_arreglo(tipo, inicio, cantidad):
+        arreglo = array(tipo)
+        arreglo.frombytes(datos[inicio:inicio + arreglo.itemsize*cantidad])
+        # El archivo se guarda en little endian
+        if sys.byteorder == "big":
+            arreglo.byteswap()
+        return arreglo, inicio + arreglo.itemsize*cantidad
 
-def predictor(s, bp, gh, ph, pcs, resultados):
-    """Predictor genérico
+    inicio = len(MAGIC_TRACE)
 
-    Esta función detecta cual predictor usar (-bp) y construye el predictor respectivo.
-    Luego recorre los valores de PCs y los resultados, empleando el predictor escogido.
-    Cuando termina de recorrer llama la función a imprimir en pantalla y finalmente
-    devuelve una lista con todas las predicciones en orden junto a una lista con los valores
-    booleanos si lo tuvo correcto o no.
+    cantidad, cantidad_pcs = 0, 0
+    if len(datos) >= inicio + 16:
+        cantidad, cantidad_pcs = struct.unpack_from("<QQ", datos, inicio)
+    if len(datos) < inicio + 16 or len(datos) != inicio + 16 + 8*cantidad_pcs + 4*cantidad + cantidad:
+        nombre = "del standard input" if archivo is None or archivo == "-" else "de " + archivo
+        raise ValueError("Los traces binarios " + nombre + " están incompletos o dañados: el encabezado indica "
+                         + str(cantidad) + " saltos y " + str(cantidad_pcs) + " PCs, pero el archivo tiene "
+                         + str(len(datos)) + " bytes")
+
+    tabla_pcs, inicio = leer_arreglo("Q", inicio + 16, cantidad_pcs)
+    ids_pcs, inicio = leer_arreglo("I", inicio, cantidad)
+    tabla_pcs = tabla_pcs.tolist()
+
+    resultados = [resultado == 1 for resultado in datos[inicio:inicio + cantidad]]
+
+    return ids_pcs, tabla_pcs, resultados
+
+def recortar_pcs(ids_pcs, tabla_pcs, s):
+    """Toma los ultimos s bits del PC de cada salto
+
+    El recorte se hace una sola vez por PC distinto y luego se expande
+    con los ids.
 
     Parameters
     ----------
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
     s : int
         El exponente del tamaño del BHT (2^s)
-    bp : int
-        Determina el predictor a usar
-    gh : int
-        Tamaño del registro global del predictor global
-    ph : int
-        Tamaño de los registros del PHT del predictor privado
+
+    Returns
+    ------
     pcs : lista de ints (bin)
-        Contiene los ultimos s bits de los valores de los PCs
-    resultados : lista de bools
-        Son True si el salto fue tomado, False si no
+        Cada entrada tiene los ultimos s bits de los PCs
+
+    """
+
+    mascara = (1 << s) - 1
+    tabla_recortada = [pc & mascara for pc in tabla_pcs]
+    return [tabla_recortada[id_pc] for id_pc in ids_pcs]
+
+def procesador_traces(s, archivo=None, datos=None):
+    """Función que procesa el archivo con los traces
+
+    Lee el archivo (por defecto el standard input) y separa tanto los valores
+    de los PCs como los resultados en listas.
+
+    Parameters
+    ----------
+    s : int
+        El exponente del tamaño del BHT (2^s)
+    archivo : str
+        Ruta del archivo con los traces. Si es None se usa el standard input
+    datos : bytes
+        Contenido ya leído de los traces; si se indica no se lee el archivo
+        y archivo solo se usa para reportar errores
 
     Returns
     ------
-    predicciones : lista de bools
-        Contiene las predicciones realizadas por el predictor en orden
-    correctos : lista de bools
-        Las entradas son True si la prediccion fue correcta, False en caso contrario
+    pcs : lista de ints (bin)
+        Cada entrada tiene los ultimos s bits de los PCs
+    resultados : lista de bools
+        Son True si el salto fue tomado y False en caso contrario
+    ids_pcs : array de uint32
+        Id del PC completo de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
 
     """
 
-    predicciones = []
-    correctos = []
+    if datos is None:
+        datos = leer_entrada(archivo)
 
-    taken_correctos = 0
-    taken_incorrectos = 0
-    not_taken_correctos = 0
-    not_taken_incorrectos = 0
+    ids_pcs, tabla_pcs, resultados = decodificar_traces(datos, archivo)
+    pcs = recortar_pcs(ids_pcs, tabla_pcs, s)
 
-     # Elige el predictor dado por el argumento -bp
-    if bp == 0:
-        predictor = Bimodal(s)
-    elif bp == 1:
-        predictor = Pshare(s, ph)
-    elif bp == 2:
-        predictor = Gshare(s, gh)
-    elif bp == 3:
-        predictor = Torneo(s, gh, ph)
-    else:
-        print("Eliga un valor entre 0 y 3.")
-        return predicciones, correctos
+    return pcs, resultados, ids_pcs, tabla_pcs
 
-    for i in range(len(pcs)):
-        pc_actual = pcs[i]
-        resultado_actual = resultados[i]
+def convertir_traces(ids_pcs, tabla_pcs, resultados, archivo):
+    """Guarda los traces en formato binario
 
-        # Prediccion realizada por el predictor elegido
-        prediccion = predictor.prediccion(pc_actual, resultado_actual)
+    El formato consiste en MAGIC_TRACE, la cantidad de saltos y de PCs
+    distintos (uint64), la tabla de PCs (uint64), los ids de cada salto
+    (uint32) y los resultados (un byte por salto), todo en little endian.
+    Leerlo es mucho más rápido que procesar el texto.
 
-        # Es True si la prediccion concuerda al resultado actual, False en caso contrario
-        es_correcto = not (prediccion ^ resultado_actual)
-        
-        # Por si se eligió guardar en un archivo
-        if i < 5000:
-            predicciones.append(prediccion)
-            correctos.append(es_correcto)
-
-        # Suma a los contadores si se tuvo el taken correcto o incorrecto al igual que a los not takens
-        if resultado_actual == T:
-            if es_correcto:
-                taken_correctos += 1
-            else:
-                taken_incorrectos += 1
-        else:
-            if es_correcto:
-                not_taken_correctos += 1
-            else:
-                not_taken_incorrectos += 1
+    Parameters
+    ----------
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
+    resultados : lista de bools
+        Son True si el salto fue tomado y False en caso contrario
+    archivo : str
+        Ruta del archivo de salida
 
-    imprimir_informacion(s, bp, gh, ph, len(pcs), taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos)
-    
-    return predicciones, correctos
+    """
 
-def guardar_archivo(bp, pcs, resultados, predicciones, correctos):
-    """Guarda en un archivo
+    tabla_binaria = array("Q", tabla_pcs)
+    ids_binarios = array("I", ids_pcs)
+    if sys.byteorder == "big":
+        tabla_binaria.byteswap()
+        ids_binarios.byteswap()
 
-    Guarda en un archivo con nombre del predictor, los valores de los PCs, el resultado del salto,
-    el de la predicción y si fue correcto o incorrecto. El formato es el siguiente:
+    with open(archivo, "wb") as file:
+        file.write(MAGIC_TRACE)
+        file.write(struct.pack("<QQ", len(ids_pcs), len(tabla_pcs)))
+        file.write(tabla_binaria.tobytes())
+        file.write(ids_binarios.tobytes())
+        file.write(bytes(resultados))
 
-    PC			Outcome	Prediction	Correct/Incorrect
-    3086629576	T		N			Incorrect
-    3086629604	T		N			Incorrect
-    3086629599	N		N			Correct
-    3086629604	T		N			Incorrect
+def estadisticas_traces(ids_pcs, tabla_pcs, resultados):
+    """Calcula estadísticas de los traces antes de simular
+
+    Para cada PC distinto (salto estático) cuenta las ejecuciones, los
+    saltos tomados y las rachas de resultados iguales consecutivos.
 
     Parameters
     ----------
-    bp : int
-        Determina el predictor usado
-    pcs : lista de ints (bin)
-        Contiene todos los bits de los valores de los PCs
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
     resultados : lista de bools
-        Son True si el salto fue tomado, False si no
+        Son True si el salto fue tomado y False en caso contrario
 
     Returns
     ------
-    predicciones : lista de bools
-        Contiene las predicciones realizadas por el predictor en orden
-    correctos : lista de bools
-        Las entradas son True si la prediccion fue correcta, False en caso contrario
-    predicciones : lista de bools
-        Contiene las predicciones realizadas por el predictor en orden
-    correctos : lista de bools
-        Las entradas son True si la prediccion fue correcta, False en caso contrario
+    estadisticas : dict
+        "saltos", "saltos_estaticos", "tomados" y "por_pc", una lista indexada
+        por id con diccionarios "pc", "ejecuciones", "tomados", "tasa_tomados",
+        "sesgo" (fracción del resultado mayoritario), "rachas" y "racha_maxima"
 
     """
-    
-    datos = "PC\t\t\tOutcome\tPrediction\tCorrect/Incorrect\n"
 
-    if bp == 0:
-        tipo = "Bimodal"
-    elif bp == 1:
-        tipo = "Pshare"
-    elif bp == 2:
-        tipo = "Gshare"
-    elif bp == 3:
-        tipo = "Tournament"
-    else:
-        return
-    
-    with open(tipo + ".txt", 'w') as file:
-            file.write(datos)
-            for i in range(len(predicciones)):
-                if resultados[i]:
-                    resultado = "T"
-                else:
-                    resultado = "N"
+    cantidad_pcs = len(tabla_pcs)
+    ejecuciones = [0] * cantidad_pcs
+    tomados = [0] * cantidad_pcs
+    rachas = [0] * cantidad_pcs
+    racha_actual = [0] * cantidad_pcs
+    racha_maxima = [0] * cantidad_pcs
+    ultimo = [None] * cantidad_pcs
+
+    for i in range(len(ids_pcs)):
+        id_pc = ids_pcs[i]
+        resultado = resultados[i]
+
+        ejecuciones[id_pc] += 1
+        if resultado:
+            tomados[id_pc] += 1
+
+        # Una racha termina cuando el salto da un resultado distinto al anterior
+        if resultado is ultimo[id_pc]:
+            racha_actual[id_pc] += 1
+        else:
+            rachas[id_pc] += 1
+            racha_actual[id_pc] = 1
+            ultimo[id_pc] = resultado
+        if racha_actual[id_pc] > racha_maxima[id_pc]:
+            racha_maxima[id_pc] = racha_actual[id_pc]
+
+    por_pc = []
+    for id_pc in range(cantidad_pcs):
+        tasa_tomados = tomados[id_pc] / ejecuciones[id_pc] if ejecuciones[id_pc] else 0.0
+        por_pc.append({
+            "pc": tabla_pcs[id_pc],
+            "ejecuciones": ejecuciones[id_pc],
+            "tomados": tomados[id_pc],
+            "tasa_tomados": tasa_tomados,
+            "sesgo": max(tasa_tomados, 1 - tasa_tomados),
+            "rachas": rachas[id_pc],
+            "racha_maxima": racha_maxima[id_pc],
+        })
+
+    return {
+        "saltos": len(ids_pcs),
+        "saltos_estaticos": sum(1 for cantidad in ejecuciones if cantidad),
+        "tomados": sum(tomados),
+        "por_pc": por_pc,
+    }
+
+def huella_trace(datos):
+    """Identificador de un archivo de traces
 
-                if predicciones[i]:
-                    prediccion = "T"
-                else:
-                    prediccion = "N"
-                
-                if correctos[i]:
-                    correcto = "Correct"
-                else:
-                    correcto = "Incorrect"
+    Parameters
+    ----------
+    datos : bytes
+        Contenido del archivo con los traces, tal como se leyó
+
+    Returns
+    ------
+    huella : str
+        SHA-256 del contenido en hexadecimal. El mismo trace en texto y en
+        formato binario tiene huellas distintas.
 
-                file.write(str(int(pcs[i], 2)) + "\t" + resultado + "\t\t" + prediccion + "\t\t\t" + correcto +"\n")
+    """
 
-def imprimir_informacion(s, bp, gh, ph, num_branches, taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos):
-    """Imprime en pantalla
+    import hashlib
 
-    Imprime en pantalla datos pertinentes a la simulación ejecutada.
+    return hashlib.sha256(datos).hexdigest()
+
+def abrir_resultados(archivo):
+    """Abre (o crea) la base de datos SQLite con los resultados guardados
+
+    Cada fila guarda los contadores de una simulación completa, identificada
+    por la huella del trace y la configuración del predictor, junto con los
+    tiempos de lectura y simulación.
+
+    Parameters
+    ----------
+    archivo : str
+        Ruta de la base de datos
+
+    Returns
+    ------
+    conexion : sqlite3.Connection
+        Conexión con la tabla resultados creada
+
+    """
+
+    import sqlite3
+
+    conexion = sqlite3.connect(archivo)
+    conexion.execute("""CREATE TABLE IF NOT EXISTS resultados (
+        trace TEXT NOT NULL,
+        bp INTEGER NOT NULL,
+        s INTEGER NOT NULL,
+        gh INTEGER NOT NULL,
+        ph INTEGER NOT NULL,
+        plegar INTEGER NOT NULL,
+        saltos INTEGER NOT NULL,
+        taken_correctos INTEGER NOT NULL,
+        taken_incorrectos INTEGER NOT NULL,
+        not_taken_correctos INTEGER NOT NULL,
+        not_taken_incorrectos INTEGER NOT NULL,
+        tiempo_lectura REAL,
+        tiempo_simulacion REAL,
+        fecha TEXT DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (trace, bp, s, gh, ph, plegar))""")
+    return conexion
+
+def normalizar_configuracion(bp, s, gh, ph, plegar=False):
+    """Quita los parámetros que no afectan al predictor elegido
+
+    Así la misma simulación siempre tiene la misma llave, por ejemplo un
+    Bimodal con -gh 8 es igual a uno con -gh 0.
 
     Parameters
     ----------
-    s : int
-        El exponente del tamaño del BHT (2^s)
     bp : int
         Determina el predictor a usar
+    s : int
+        El exponente del tamaño del BHT (2^s)
     gh : int
         Tamaño del registro global del predictor global
     ph : int
         Tamaño de los registros del PHT del predictor privado
-    num_branches : int
-        Contiene la cantidad de saltos totales
-    taken_correctos : int
-        Contiene la cantidad de saltos tomados predecidos correctamente
-    taken_incorrectos : int
-        Contiene la cantidad de saltos tomados predecidos incorrectamente
-    not_taken_correctos : int
-        Contiene la cantidad de saltos no tomados predecidos correctamente
-    not_taken_incorrectos : int
-        Contiene la cantidad de saltos no tomados predecidos incorrectamente
-
-    """
+    plegar : bool
+        Si las historias más largas que s se pliegan
+
+    Returns
+    ------
+    configuracion : tupla
+        (bp, s, gh, ph, plegar) normalizada
+
+    """
+
+    if bp not in (2, 3):
+        gh = 0
+    if bp not in (1, 3):
+        ph = 0
+    # Plegar solo cambia algo si alguna historia es más larga que s
+    plegar = bool(plegar) and max(gh, ph) > s
+
+    return bp, s, gh, ph, plegar
+
+def buscar_resultado(conexion, huella, configuracion):
+    """Busca una simulación ya guardada
+
+    Parameters
+    ----------
+    conexion : sqlite3.Connection
+        Conexión devuelta por abrir_resultados
+    huella : str
+        Huella del trace
+    configuracion : tupla
+        (bp, s, gh, ph, plegar) normalizada
+
+    Returns
+    ------
+    resultado : tupla de ints
+        saltos, taken_correctos, taken_incorrectos, not_taken_correctos,
+        not_taken_incorrectos; None si no se ha simulado
+
+    """
+
+    return conexion.execute(
+        """SELECT saltos, taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos
+        FROM resultados WHERE trace = ? AND bp = ? AND s = ? AND gh = ? AND ph = ? AND plegar = ?""",
+        (huella,) + tuple(configuracion)).fetchone()
+
+def guardar_resultado(conexion, huella, configuracion, saltos, contadores, tiempos=(None, None)):
+    """Guarda los contadores de una simulación
+
+    Parameters
+    ----------
+    conexion : sqlite3.Connection
+        Conexión devuelta por abrir_resultados
+    huella : str
+        Huella del trace
+    configuracion : tupla
+        (bp, s, gh, ph, plegar) normalizada
+    saltos : int
+        Cantidad de saltos simulados
+    contadores : tupla de ints
+        taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos
+    tiempos : tupla de floats
+        Segundos de lectura de los traces y de simulación, None si no se midieron
+
+    """
+
+    conexion.execute(
+        """INSERT OR REPLACE INTO resultados (trace, bp, s, gh, ph, plegar, saltos, taken_correctos,
+        taken_incorrectos, not_taken_correctos, not_taken_incorrectos, tiempo_lectura, tiempo_simulacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (huella,) + tuple(configuracion) + (saltos,) + tuple(contadores) + tuple(tiempos))
+    conexion.commit()
+
+def entero_en_rango(minimo, maximo=None):
+    """Crea un validador de enteros para argparse
+
+    Parameters
+    ----------
+    minimo : int
+        Valor mínimo aceptado
+    maximo : int
+        Valor máximo aceptado, None si no hay límite
+
+    Returns
+    ------
+    validar : función
+        Convierte el argumento a int o lanza argparse.ArgumentTypeError
+
+    """
+
+    def validar(valor):
+        try:
+            numero = int(valor)
+        except ValueError:
+            raise argparse.ArgumentTypeError("'" + valor + "' no es un entero")
+
+        if numero < minimo or (maximo is not None and numero > maximo):
+            if maximo is None:
+                rango = "mayor o igual a " + str(minimo)
+            else:
+                rango = "entre " + str(minimo) + " y " + str(maximo)
+            raise argparse.ArgumentTypeError("'" + valor + "' debe ser " + rango)
+
+        return numero
+
+    return validar
+
+def agregar_parametros(parser, multiples=False):
+    """Agrega los parámetros de los predictores a un parser
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        Parser al cual se agregan los argumentos -s, -bp, -gh, -ph, --fold, --trace y --db
+    multiples : bool
+        Si es True cada parámetro acepta una lista de valores (para barridos)
+
+    """
+
+    nargs = "+" if multiples else None
+    bp_defecto = [0] if multiples else 0
+    historia_defecto = [0] if multiples else 0
+
+    parser.add_argument("-s", "--size", dest="s", type=entero_en_rango(1, S_MAXIMO), nargs=nargs,
+                        required=True, help="exponente del tamaño de la tabla BHT (2^s)")
+    parser.add_argument("-bp", "--branchpredictor", dest="bp", type=entero_en_rango(0, 3), nargs=nargs,
+                        default=bp_defecto, help="0: Bimodal, 1: Pshare, 2: Gshare, 3: Tournament")
+    parser.add_argument("-gh", "--globalhistory", dest="gh", type=entero_en_rango(0), nargs=nargs,
+                        default=historia_defecto, help="tamaño del registro de historia global")
+    parser.add_argument("-ph", "--privatehistory", dest="ph", type=entero_en_rango(0), nargs=nargs,
+                        default=historia_defecto, help="tamaño de los registros de historia privada")
+    parser.add_argument("--fold", dest="plegar", action="store_true",
+                        help="pliega las historias más largas que s (XOR de bloques de s bits) para indexar el BHT")
+    parser.add_argument("-t", "--trace", default=None,
+                        help="archivo con los traces (texto, .gz o binario); por defecto el standard input")
+    parser.add_argument("--db", default=None,
+                        help="base SQLite de resultados; las simulaciones ya guardadas no se repiten")
+
+def construir_parser():
+    """Construye el parser de argumentos con sus subcomandos
+
+    Returns
+    ------
+    parser : argparse.ArgumentParser
+        Parser con los subcomandos simulate, sample, sweep, search, convert, stats, results, telemetry y bench
+    subcomandos : dict
+        El parser de cada subcomando, para reportar errores con su propio uso
+
+    """
+
+    parser = argparse.ArgumentParser(prog="branch_predictor.py",
+                                     description="Simulador de predictores de saltos.")
+    subparsers = parser.add_subparsers(dest="comando", metavar="{" + ",".join(SUBCOMANDOS) + "}")
+
+    simulate = subparsers.add_parser("simulate", help="simula un predictor (comando por defecto)")
+    agregar_parametros(simulate)
+    simulate.add_argument("-o", "--output", dest="o", type=entero_en_rango(0, 1), default=0,
+                          help="1 guarda las primeras 5000 predicciones en un archivo")
+    simulate.add_argument("--telemetry", dest="telemetria", default=None,
+                          help="archivo donde se registran los contadores de cada ventana de saltos")
+    simulate.add_argument("--window", dest="ventana", type=entero_en_rango(1, 2**32 - 1), default=10000,
+                          help="cantidad de saltos por ventana de --telemetry")
+    simulate.set_defaults(funcion=comando_simular)
+
+    sample = subparsers.add_parser("sample", help="estima la precisión simulando solo muestras del trace")
+    agregar_parametros(sample)
+    sample.add_argument("--samples", dest="muestras", type=entero_en_rango(1), default=50,
+                        help="cantidad de muestras")
+    sample.add_argument("--sample-size", dest="tamano", type=entero_en_rango(1), default=10000,
+                        help="saltos medidos en cada muestra")
+    sample.add_argument("--warmup", dest="calentamiento", type=entero_en_rango(0), default=10000,
+                        help="saltos simulados sin medir antes de cada muestra para calentar las tablas")
+    sample.add_argument("--random", dest="aleatorio", action="store_true",
+                        help="posición aleatoria de cada muestra dentro de su periodo")
+    sample.add_argument("--seed", dest="semilla", type=int, default=0, help="semilla de --random")
+    sample.add_argument("--confidence", dest="confianza", type=float, default=0.95,
+                        help="nivel de confianza del intervalo")
+    sample.add_argument("--validate", dest="validar", action="store_true",
+                        help="simula también el trace completo y compara")
+    sample.set_defaults(funcion=comando_muestreo)
+
+    sweep = subparsers.add_parser("sweep", help="simula todas las combinaciones de parámetros")
+    agregar_parametros(sweep, multiples=True)
+    sweep.set_defaults(funcion=comando_barrido)
+
+    search = subparsers.add_parser("search", help="frontera de Pareto de precisión contra bits de estado")
+    agregar_parametros(search, multiples=True)
+    search.add_argument("--budget", dest="presupuesto", type=entero_en_rango(1), required=True,
+                        help="máximo de bits de estado del predictor")
+    search.add_argument("--sample", dest="muestra", type=entero_en_rango(1), default=100000,
+                        help="cantidad de saltos iniciales para estimar la precisión")
+    search.add_argument("--margin", dest="margen", type=float, default=1.0,
+                        help="puntos porcentuales de tolerancia antes de descartar una configuración")
+    search.set_defaults(funcion=comando_busqueda)
+
+    convert = subparsers.add_parser("convert", help="convierte un trace de texto a formato binario")
+    convert.add_argument("entrada", help="archivo con los traces (texto o .gz), \"-\" para el standard input")
+    convert.add_argument("salida", help="archivo binario de salida")
+    convert.set_defaults(funcion=comando_convertir)
+
+    stats = subparsers.add_parser("stats", help="estadísticas de los traces por salto estático")
+    stats.add_argument("-t", "--trace", default=None,
+                       help="archivo con los traces (texto, .gz o binario); por defecto el standard input")
+    stats.add_argument("--top", type=entero_en_rango(0), default=20,
+                       help="cantidad de saltos estáticos más ejecutados a imprimir")
+    stats.add_argument("--csv", default=None, help="guarda las estadísticas de todos los PCs en este archivo")
+    stats.set_defaults(funcion=comando_estadisticas)
+
+    results = subparsers.add_parser("results", help="consulta la base de resultados sin simular")
+    results.add_argument("--db", required=True, help="base SQLite de resultados")
+    results.add_argument("--hash", dest="huella", default="",
+                         help="solo los traces cuya huella (SHA-256) empieza con este prefijo")
+    results.add_argument("--best", dest="mejor", action="store_true",
+                         help="solo la frontera de Pareto de precisión contra bits de estado de cada trace")
+    results.add_argument("--budget", dest="presupuesto", type=entero_en_rango(1), default=None,
+                         help="descarta las configuraciones con más bits de estado")
+    results.set_defaults(funcion=comando_resultados)
+
+    telemetry = subparsers.add_parser("telemetry", help="convierte un archivo de --telemetry a CSV")
+    telemetry.add_argument("archivo", help="archivo escrito por simulate --telemetry")
+    telemetry.set_defaults(funcion=comando_telemetria)
+
+    bench = subparsers.add_parser("bench", help="mide el tiempo de arranque del programa")
+    bench.add_argument("-r", "--repeticiones", type=entero_en_rango(1), default=10,
+                       help="cantidad de arranques a medir")
+    bench.add_argument("--objetivo-ms", dest="objetivo_ms", type=entero_en_rango(1), default=OBJETIVO_ARRANQUE_MS,
+                       help="tiempo máximo aceptado para la mediana del arranque")
+    bench.set_defaults(funcion=comando_bench)
+
+    return parser, subparsers.choices
+
+def validar_historias(parser, bps, ghs, phs):
+    """Verifica que los predictores elegidos tengan historias válidas
+
+    En un barrido basta con que haya algún tamaño mayor que 0; las
+    combinaciones con historia 0 se descartan en configuraciones_barrido.
+
+    Parameters
+    ----------
+    parser : argparse.ArgumentParser
+        Parser del subcomando con el cual se reporta el error
+    bps : lista de ints
+        Predictores elegidos
+    ghs : lista de ints
+        Tamaños del registro global
+    phs : lista de ints
+        Tamaños de los registros privados
+
+    """
+
+    if any(bp in (2, 3) for bp in bps) and max(ghs) == 0:
+        parser.error("Gshare y Tournament requieren -gh mayor que 0")
+    if any(bp in (1, 3) for bp in bps) and max(phs) == 0:
+        parser.error("Pshare y Tournament requieren -ph mayor que 0")
+
+def procesador_argumentos(argv=None):
+    """Función que procesa los argumentos pasados en la terminal
+
+    Utiliza argparse para validar los argumentos. Si no se indica un
+    subcomando se asume simulate, de forma que la línea de comandos
+    original (-s, -bp, -gh, -ph, -o) sigue funcionando.
+
+    Parameters
+    ----------
+    argv : lista de strings
+        Argumentos a procesar, por defecto sys.argv[1:]
+
+    Returns
+    ------
+    argumentos : argparse.Namespace
+        Posee los valores validados de los argumentos y la función del subcomando
+
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if not argv or argv[0] not in SUBCOMANDOS + ("-h", "--help"):
+        argv = ["simulate"] + list(argv)
+
+    parser, subcomandos = construir_parser()
+    argumentos = parser.parse_args(argv)
+    subparser = subcomandos[argumentos.comando]
+
+    # Los archivos de traces ("-" es el standard input) deben existir antes de empezar
+    archivo = getattr(argumentos, "trace", None) or getattr(argumentos, "entrada", None)
+    if archivo is not None and archivo != "-" and not os.path.isfile(archivo):
+        subparser.error("no existe el archivo de traces '" + archivo + "'")
+
+    if argumentos.comando == "sample" and not 0 < argumentos.confianza < 1:
+        subparser.error("--confidence debe estar entre 0 y 1")
+    if argumentos.comando == "sample" and argumentos.db is not None and not argumentos.validar:
+        subparser.error("--db solo se usa con --validate")
+
+    if argumentos.comando in ("simulate", "sample", "sweep", "search"):
+        def como_lista(valor):
+            return valor if isinstance(valor, list) else [valor]
+        validar_historias(subparser, como_lista(argumentos.bp), como_lista(argumentos.gh), como_lista(argumentos.ph))
+
+    return argumentos
+
+def crear_predictor(s, bp, gh, ph, plegar=False):
+    """Construye el predictor indicado por -bp
+
+    Parameters
+    ----------
+    s : int
+        El exponente del tamaño del BHT (2^s)
+    bp : int
+        Determina el predictor a usar
+    gh : int
+        Tamaño del registro global del predictor global
+    ph : int
+        Tamaño de los registros del PHT del predictor privado
+    plegar : bool
+        Si es True las historias más largas que s se pliegan para indexar el BHT
+
+    Returns
+    ------
+    predictor : Bimodal, Pshare, Gshare o Torneo
+        El predictor elegido, None si bp no es válido
+
+    """
+
+    if bp == 0:
+        return Bimodal(s)
+    elif bp == 1:
+        return Pshare(s, ph, plegar)
+    elif bp == 2:
+        return Gshare(s, gh, plegar)
+    elif bp == 3:
+        return Torneo(s, gh, ph, plegar)
+    return None
+
+def bits_de_configuracion(bp, s, gh, ph):
+    """Bits de estado que tendría un predictor en hardware
+
+    El modelo cuenta contadores de 2 bits en cada BHT y en el metapredictor,
+    ph bits por entrada del PHT y gh bits de registro global. Se calcula a
+    partir de los parámetros, sin construir las tablas.
+
+    Parameters
+    ----------
+    bp : int
+        Determina el predictor a usar
+    s : int
+        El exponente del tamaño del BHT (2^s)
+    gh : int
+        Tamaño del registro global del predictor global
+    ph : int
+        Tamaño de los registros del PHT del predictor privado
+
+    Returns
+    ------
+    bits : int
+        Cantidad de bits de estado, None si bp no es válido
+
+    """
+
+    numero_entradas = pow(2, s)
+    bimodal = numero_entradas * 2
+    pshare = numero_entradas * 2 + numero_entradas * ph
+    gshare = numero_entradas * 2 + gh
+
+    if bp == 0:
+        return bimodal
+    elif bp == 1:
+        return pshare
+    elif bp == 2:
+        return gshare
+    elif bp == 3:
+        return numero_entradas * 2 + pshare + gshare
+    return None
+
+def simular(predictor_elegido, pcs, resultados, cantidad_guardada=5000, escritor=None):
+    """Recorre los traces con un predictor ya construido
+
+    Si se indica un escritor, al final de cada ventana de saltos se le
+    agregan los saltos de la ventana, sus contadores de taken y not taken
+    correctos e incorrectos y, en el predictor por torneo, cuántas
+    predicciones se tomaron del Gshare según el metapredictor.
+
+    Parameters
+    ----------
+    predictor_elegido : Bimodal, Pshare, Gshare o Torneo
+        Predictor a emplear
+    pcs : lista de ints (bin)
+        Contiene los ultimos s bits de los valores de los PCs
+    resultados : lista de bools
+        Son True si el salto fue tomado, False si no
+    cantidad_guardada : int
+        Cantidad de predicciones iniciales que se devuelven
+    escritor : EscritorTelemetria
+        Destino de la telemetría, creado con columnas_telemetria; None para no registrarla
+
+    Returns
+    ------
+    predicciones : lista de bools
+        Contiene las primeras predicciones realizadas por el predictor en orden
+    correctos : lista de bools
+        Las entradas son True si la prediccion fue correcta, False en caso contrario
+    contadores : tupla de ints
+        taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos
+
+    """
+
+    predicciones = []
+    correctos = []
+
+    taken_correctos = 0
+    taken_incorrectos = 0
+    not_taken_correctos = 0
+    not_taken_incorrectos = 0
+
+    # Sin telemetría todo el trace es una sola ventana
+    ventana = escritor.ventana if escritor is not None else max(len(pcs), 1)
+    # Solo con telemetría se cuenta cuántas veces el metapredictor elige Gshare
+    contar_gshare = escritor is not None and isinstance(predictor_elegido, Torneo)
+    usa_gshare = 0
+    anteriores = (0, 0, 0, 0, 0)
+
+    for inicio in range(0, len(pcs), ventana):
+        fin = min(inicio + ventana, len(pcs))
+
+        for i in range(inicio, fin):
+            pc_actual = pcs[i]
+            resultado_actual = resultados[i]
+
+            # El metapredictor elige Gshare si su contador está en [T, -]
+            if contar_gshare and predictor_elegido.metapredictor[pc_actual][0]:
+                usa_gshare += 1
+
+            # Prediccion realizada por el predictor elegido
+            prediccion = predictor_elegido.prediccion(pc_actual, resultado_actual)
+
+            # Es True si la prediccion concuerda al resultado actual, False en caso contrario
+            es_correcto = not (prediccion ^ resultado_actual)
+
+            # Por si se eligió guardar en un archivo
+            if i < cantidad_guardada:
+                predicciones.append(prediccion)
+                correctos.append(es_correcto)
+
+            # Suma a los contadores si se tuvo el taken correcto o incorrecto al igual que a los not takens
+            if resultado_actual == T:
+                if es_correcto:
+                    taken_correctos += 1
+                else:
+                    taken_incorrectos += 1
+            else:
+                if es_correcto:
+                    not_taken_correctos += 1
+                else:
+                    not_taken_incorrectos += 1
+
+        if escritor is not None:
+            # La fila de la ventana es la diferencia con los contadores al final de la anterior
+            actuales = (taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos, usa_gshare)
+            fila = [fin - inicio] + [actual - anterior for actual, anterior in zip(actuales, anteriores)]
+            escritor.agregar(fila if contar_gshare else fila[:5])
+            anteriores = actuales
+
+    contadores = (taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos)
+
+    return predicciones, correctos, contadores
+
+def inicios_muestras(total, cantidad, tamano, calentamiento, aleatorio=False, semilla=0):
+    """Calcula dónde empieza cada muestra de una simulación por muestreo
+
+    El trace se divide en cantidad periodos iguales y se toma una muestra
+    por periodo. Las muestras periódicas van al final de cada periodo; las
+    aleatorias en una posición al azar del periodo. En ambos casos antes de
+    cada muestra caben calentamiento saltos dentro del mismo periodo.
+
+    Parameters
+    ----------
+    total : int
+        Cantidad de saltos del trace
+    cantidad : int
+        Cantidad de muestras
+    tamano : int
+        Saltos medidos en cada muestra
+    calentamiento : int
+        Saltos que se simulan sin medir antes de cada muestra
+    aleatorio : bool
+        Si es True la posición de cada muestra dentro de su periodo es aleatoria
+    semilla : int
+        Semilla para las posiciones aleatorias
+
+    Returns
+    ------
+    inicios : lista de ints
+        Índice del primer salto medido de cada muestra, None si el trace es
+        muy corto para las muestras pedidas
+
+    """
+
+    periodo = total // cantidad
+    holgura = periodo - calentamiento - tamano
+    if holgura < 0:
+        return None
+
+    if not aleatorio:
+        return [k*periodo + calentamiento + holgura for k in range(cantidad)]
+
+    import random
+
+    generador = random.Random(semilla)
+    return [k*periodo + calentamiento + generador.randint(0, holgura) for k in range(cantidad)]
+
+def simular_muestreo(predictor_elegido, pcs, resultados, inicios, tamano, calentamiento):
+    """Simula solo las muestras del trace
+
+    Antes de cada muestra se simulan calentamiento saltos para actualizar
+    las tablas del predictor sin contar sus predicciones. El resto del trace
+    no se simula.
+
+    Parameters
+    ----------
+    predictor_elegido : Bimodal, Pshare, Gshare o Torneo
+        Predictor a emplear
+    pcs : lista de ints (bin)
+        Contiene los ultimos s bits de los valores de los PCs
+    resultados : lista de bools
+        Son True si el salto fue tomado, False si no
+    inicios : lista de ints
+        Índice del primer salto medido de cada muestra, en orden
+    tamano : int
+        Saltos medidos en cada muestra
+    calentamiento : int
+        Saltos que se simulan sin medir antes de cada muestra
+
+    Returns
+    ------
+    precisiones : lista de floats
+        Porcentaje de predicciones correctas de cada muestra
+    simulados : int
+        Cantidad de saltos simulados, incluyendo el calentamiento
+
+    """
+
+    precisiones = []
+    simulados = 0
+    fin_anterior = 0
+
+    for inicio in inicios:
+        # Calentamiento: actualiza las tablas sin contar las predicciones
+        for i in range(max(inicio - calentamiento, fin_anterior), inicio):
+            predictor_elegido.prediccion(pcs[i], resultados[i])
+            simulados += 1
+
+        correctos = 0
+        for i in range(inicio, inicio + tamano):
+            resultado_actual = resultados[i]
+            if not (predictor_elegido.prediccion(pcs[i], resultado_actual) ^ resultado_actual):
+                correctos += 1
+        simulados += tamano
+        fin_anterior = inicio + tamano
+
+        precisiones.append(correctos/tamano*100)
+
+    return precisiones, simulados
+
+def intervalo_confianza(valores, confianza):
+    """Intervalo de confianza de la media de las muestras
+
+    Usa la aproximación normal: media ± z * desviación / raíz(n).
+
+    Parameters
+    ----------
+    valores : lista de floats
+        Valor medido en cada muestra
+    confianza : float
+        Nivel de confianza, por ejemplo 0.95
+
+    Returns
+    ------
+    media : float
+        Media de los valores
+    margen : float
+        Mitad del ancho del intervalo
+
+    """
+
+    n = len(valores)
+    media = sum(valores)/n
+    if n < 2:
+        return media, float("inf")
+
+    desviacion = math.sqrt(sum((valor - media)**2 for valor in valores)/(n - 1))
+
+    # statistics solo se usa en el subcomando sample
+    import statistics
+
+    # Cuantil de la normal estándar
+    z = statistics.NormalDist().inv_cdf((1 + confianza)/2)
+
+    return media, z*desviacion/math.sqrt(n)
+
+def columnas_telemetria(bp):
+    """Columnas que registra simular con telemetría para un predictor
+
+    Parameters
+    ----------
+    bp : int
+        Determina el predictor usado
+
+    Returns
+    ------
+    columnas : lista de strings
+        Nombres de las columnas
+
+    """
+
+    columnas = ["saltos", "taken_correctos", "taken_incorrectos", "not_taken_correctos", "not_taken_incorrectos"]
+    if bp == 3:
+        columnas.append("usa_gshare")
+    return columnas
+
+def leer_telemetria(archivo):
+    """Lee un archivo escrito por EscritorTelemetria
+
+    Si el archivo se está escribiendo, el último bloque incompleto se ignora.
+
+    Parameters
+    ----------
+    archivo : str
+        Ruta del archivo de telemetría
+
+    Returns
+    ------
+    ventana : int
+        Cantidad de saltos por ventana
+    columnas : dict
+        Cada nombre de columna con la lista de sus valores, una por ventana
+
+    """
+
+    with open(archivo, "rb") as file:
+        datos = file.read()
+
+    if not datos.startswith(MAGIC_TELEMETRIA):
+        raise ValueError(archivo + " no es un archivo de telemetría")
+
+    inicio = len(MAGIC_TELEMETRIA)
+    ventana, largo_nombres = struct.unpack_from("<IH", datos, inicio)
+    inicio += 6
+    nombres = datos[inicio:inicio + largo_nombres].decode().split(",")
+    inicio += largo_nombres
+
+    columnas = {nombre: [] for nombre in nombres}
+    while inicio + 4 <= len(datos):
+        filas = struct.unpack_from("<I", datos, inicio)[0]
+        fin = inicio + 4 + 4*filas*len(nombres)
+        if fin > len(datos):
+            break
+
+        inicio += 4
+        for nombre in nombres:
+            valores = array("I")
+            valores.frombytes(datos[inicio:inicio + 4*filas])
+            if sys.byteorder == "big":
+                valores.byteswap()
+            columnas[nombre].extend(valores)
+            inicio += 4*filas
+
+    return ventana, columnas
+
+def predictor(s, bp, gh, ph, pcs, resultados, plegar=False, escritor=None):
+    """Predictor genérico
+
+    Esta función detecta cual predictor usar (-bp) y construye el predictor respectivo.
+    Luego recorre los valores de PCs y los resultados, empleando el predictor escogido.
+    Cuando termina de recorrer llama la función a imprimir en pantalla y finalmente
+    devuelve una lista con todas las predicciones en orden junto a una lista con los valores
+    booleanos si lo tuvo correcto o no y los contadores de la simulación.
+
+    Parameters
+    ----------
+    s : int
+        El exponente del tamaño del BHT (2^s)
+    bp : int
+        Determina el predictor a usar
+    gh : int
+        Tamaño del registro global del predictor global
+    ph : int
+        Tamaño de los registros del PHT del predictor privado
+    pcs : lista de ints (bin)
+        Contiene los ultimos s bits de los valores de los PCs
+    resultados : lista de bools
+        Son True si el salto fue tomado, False si no
+    plegar : bool
+        Si es True las historias más largas que s se pliegan para indexar el BHT
+    escritor : EscritorTelemetria
+        Si se indica, se registra la telemetría por ventanas
+
+    Returns
+    ------
+    predicciones : lista de bools
+        Contiene las predicciones realizadas por el predictor en orden
+    correctos : lista de bools
+        Las entradas son True si la prediccion fue correcta, False en caso contrario
+    contadores : tupla de ints
+        taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos
+
+    """
+
+     # Elige el predictor dado por el argumento -bp
+    predictor_elegido = crear_predictor(s, bp, gh, ph, plegar)
+    if predictor_elegido is None:
+        print("Eliga un valor entre 0 y 3.")
+        return [], [], (0, 0, 0, 0)
+
+    predicciones, correctos, contadores = simular(predictor_elegido, pcs, resultados, escritor=escritor)
+
+    imprimir_informacion(s, bp, gh, ph, len(pcs), *contadores)
+
+    return predicciones, correctos, contadores
+
+def guardar_archivo(bp, ids_pcs, tabla_pcs, resultados, predicciones, correctos):
+    """Guarda en un archivo
+
+    Guarda en un archivo con nombre del predictor, los valores de los PCs, el resultado del salto,
+    el de la predicción y si fue correcto o incorrecto. El formato es el siguiente:
+
+    PC			Outcome	Prediction	Correct/Incorrect
+    3086629576	T		N			Incorrect
+    3086629604	T		N			Incorrect
+    3086629599	N		N			Correct
+    3086629604	T		N			Incorrect
+
+    Parameters
+    ----------
+    bp : int
+        Determina el predictor usado
+    ids_pcs : array de uint32
+        Id del PC de cada salto, en orden
+    tabla_pcs : lista de ints
+        Todos los bits de cada PC distinto, indexada por id
+    resultados : lista de bools
+        Son True si el salto fue tomado, False si no
+
+    Returns
+    ------
+    predicciones : lista de bools
+        Contiene las predicciones realizadas por el predictor en orden
+    correctos : lista de bools
+        Las entradas son True si la prediccion fue correcta, False en caso contrario
+    predicciones : lista de bools
+        Contiene las predicciones realizadas por el predictor en orden
+    correctos : lista de bools
+        Las entradas son True si la prediccion fue correcta, False en caso contrario
+
+    """
+    
+    datos = "PC\t\t\tOutcome\tPrediction\tCorrect/Incorrect\n"
+
+    if bp == 0:
+        tipo = "Bimodal"
+    elif bp == 1:
+        tipo = "Pshare"
+    elif bp == 2:
+        tipo = "Gshare"
+    elif bp == 3:
+        tipo = "Tournament"
+    else:
+        return
+    
+    with open(tipo + ".txt", 'w') as file:
+            file.write(datos)
+            for i in range(len(predicciones)):
+                if resultados[i]:
+                    resultado = "T"
+                else:
+                    resultado = "N"
+
+                if predicciones[i]:
+                    prediccion = "T"
+                else:
+                    prediccion = "N"
+                
+                if correctos[i]:
+                    correcto = "Correct"
+                else:
+                    correcto = "Incorrect"
+
+                file.write(str(tabla_pcs[ids_pcs[i]]) + "\t" + resultado + "\t\t" + prediccion + "\t\t\t" + correcto +"\n")
+
+def imprimir_informacion(s, bp, gh, ph, num_branches, taken_correctos, taken_incorrectos, not_taken_correctos, not_taken_incorrectos):
+    """Imprime en pantalla
+
+    Imprime en pantalla datos pertinentes a la simulación ejecutada.
+
+    Parameters
+    ----------
+    s : int
+        El exponente del tamaño del BHT (2^s)
+    bp : int
+        Determina el predictor a usar
+    gh : int
+        Tamaño del registro global del predictor global
+    ph : int
+        Tamaño de los registros del PHT del predictor privado
+    num_branches : int
+        Contiene la cantidad de saltos totales
+    taken_correctos : int
+        Contiene la cantidad de saltos tomados predecidos correctamente
+    taken_incorrectos : int
+        Contiene la cantidad de saltos tomados predecidos incorrectamente
+    not_taken_correctos : int
+        Contiene la cantidad de saltos no tomados predecidos correctamente
+    not_taken_incorrectos : int
+        Contiene la cantidad de saltos no tomados predecidos incorrectamente
+
+    """
 
     if bp == 0:
         tipo = "Bimodal"
@@ -741,7 +1787,8 @@ def imprimir_informacion(s, bp, gh, ph, num_branches, taken_correctos, taken_inc
     Branch prediction type:\t\t\t\t""" + tipo + """
     BHT size (entries):\t\t\t\t\t""" + str(pow(2, s)) + """
     Global history register size:\t\t\t""" + str(gh) + """
-    Private history register size:\t\t\t""" + str(gh) + """
+    Private history register size:\t\t\t""" + str(ph) + """
+    Total predictor state (bits):\t\t\t""" + str(bits_de_configuracion(bp, s, gh, ph)) + """
     ---------------------------------------------------------------------
     Simulation results:
     ---------------------------------------------------------------------
@@ -756,48 +1803,549 @@ def imprimir_informacion(s, bp, gh, ph, num_branches, taken_correctos, taken_inc
     print(informacion)
 
 
-def main():
-    """Función principal del programa
+def configuraciones_barrido(bps, ss, ghs, phs, plegar=False):
+    """Genera las combinaciones de parámetros de un barrido
+
+    Las configuraciones se normalizan con normalizar_configuracion para
+    no simular dos veces la misma, y se descartan las que dejan sin
+    historia a un predictor que la usa (como en validar_historias).
 
-    Llama todos las funciones pertinentes a los predictores.
-    Decide si guardar el archivo o no a partir del argumento -o
+    Parameters
+    ----------
+    bps : lista de ints
+        Predictores a simular
+    ss : lista de ints
+        Exponentes del tamaño del BHT
+    ghs : lista de ints
+        Tamaños del registro global
+    phs : lista de ints
+        Tamaños de los registros privados
+    plegar : bool
+        Si las historias más largas que s se pliegan
 
-    Si se quiere revisar los tiempos, se pueden descomentar las líneas 
-    predecidas por "PROBAR TIEMPOS".
+    Returns
+    ------
+    configuraciones : lista de tuplas
+        Cada entrada es (bp, s, gh, ph, plegar) sin repetir
 
     """
 
-    # PROBAR TIEMPOS
-    #a = datetime.datetime.now()
+    configuraciones = []
+    for bp in bps:
+        for s in ss:
+            for gh in ghs:
+                for ph in phs:
+                    if (bp in (2, 3) and gh == 0) or (bp in (1, 3) and ph == 0):
+                        continue
+                    configuracion = normalizar_configuracion(bp, s, gh, ph, plegar)
+                    if configuracion not in configuraciones:
+                        configuraciones.append(configuracion)
+    return configuraciones
+
+def comando_simular(argumentos):
+    """Subcomando simulate, equivalente a la línea de comandos original
+
+    Con --db la simulación se busca primero en la base de resultados y,
+    si no estaba, se guarda al terminar.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    s, bp, gh, ph = argumentos.s, argumentos.bp, argumentos.gh, argumentos.ph
+    configuracion = normalizar_configuracion(bp, s, gh, ph, argumentos.plegar)
+
+    datos = leer_entrada(argumentos.trace)
+
+    conexion = None
+    if argumentos.db is not None:
+        conexion = abrir_resultados(argumentos.db)
+        huella = huella_trace(datos)
+
+        # Con -o 1 o --telemetry hacen falta las predicciones, por lo que siempre se simula
+        guardado = buscar_resultado(conexion, huella, configuracion)
+        if guardado is not None and argumentos.o == 0 and argumentos.telemetria is None:
+            imprimir_informacion(s, bp, gh, ph, *guardado)
+            return
 
-    valores_argumentos = procesador_argumentos()
-    
-    # Valores de los argumentos
-    s = int(valores_argumentos[0])
-    bp = int(valores_argumentos[1])
-    gh = int(valores_argumentos[2])
-    ph = int(valores_argumentos[3])
-    o = int(valores_argumentos[4])
-    
     # Se extrae los valores de los PCs y los resultados del archivo
-    pcs, resultados, pcs_completos = procesador_traces(s)
-    
-    predicciones, correctos = predictor(s, bp, gh, ph, pcs, resultados)
+    inicio = time.perf_counter()
+    pcs, resultados, ids_pcs, tabla_pcs = procesador_traces(s, argumentos.trace, datos)
+    tiempo_lectura = time.perf_counter() - inicio
+
+    escritor = None
+    if argumentos.telemetria is not None:
+        escritor = EscritorTelemetria(argumentos.telemetria, argumentos.ventana, columnas_telemetria(bp))
+
+    inicio = time.perf_counter()
+    predicciones, correctos, contadores = predictor(s, bp, gh, ph, pcs, resultados, argumentos.plegar, escritor)
+    tiempo_simulacion = time.perf_counter() - inicio
+
+    if escritor is not None:
+        escritor.cerrar()
+
+    if conexion is not None:
+        guardar_resultado(conexion, huella, configuracion, len(resultados), contadores,
+                          (tiempo_lectura, tiempo_simulacion))
 
     # Se guarda el archivo si el argumento -o es 1
-    if o == 1:
-        guardar_archivo(bp, pcs_completos, resultados, predicciones, correctos)
+    if argumentos.o == 1:
+        guardar_archivo(bp, ids_pcs, tabla_pcs, resultados, predicciones, correctos)
 
-    
-    # PROBAR TIEMPOS
-    #b = datetime.datetime.now()
-    #c = b - a
+def comando_barrido(argumentos):
+    """Subcomando sweep
+
+    Lee los traces una sola vez y simula todas las combinaciones de
+    parámetros. Imprime una línea CSV por configuración. Con --db las
+    configuraciones ya guardadas no se vuelven a simular, y si todas
+    estaban guardadas ni siquiera se procesan los traces.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    datos = leer_entrada(argumentos.trace)
+
+    conexion = None
+    if argumentos.db is not None:
+        conexion = abrir_resultados(argumentos.db)
+        huella = huella_trace(datos)
+
+    print("predictor,s,gh,ph,branches,taken_correct,taken_incorrect,not_taken_correct,not_taken_incorrect,accuracy")
+
+    traces = None
+    pcs_por_s = {}
+    for configuracion in configuraciones_barrido(argumentos.bp, argumentos.s, argumentos.gh, argumentos.ph, argumentos.plegar):
+        bp, s, gh, ph, plegar = configuracion
+
+        guardado = None
+        if conexion is not None:
+            guardado = buscar_resultado(conexion, huella, configuracion)
+
+        if guardado is not None:
+            saltos, contadores = guardado[0], guardado[1:]
+        else:
+            # Los traces se procesan solo cuando hace falta simular
+            if traces is None:
+                inicio = time.perf_counter()
+                traces = decodificar_traces(datos, argumentos.trace)
+                tiempo_lectura = time.perf_counter() - inicio
+            ids_pcs, tabla_pcs, resultados = traces
+
+            if s not in pcs_por_s:
+                pcs_por_s[s] = recortar_pcs(ids_pcs, tabla_pcs, s)
+
+            inicio = time.perf_counter()
+            _, _, contadores = simular(crear_predictor(s, bp, gh, ph, plegar), pcs_por_s[s], resultados, 0)
+            tiempo_simulacion = time.perf_counter() - inicio
+            saltos = len(resultados)
+
+            if conexion is not None:
+                guardar_resultado(conexion, huella, configuracion, saltos, contadores,
+                                  (tiempo_lectura, tiempo_simulacion))
+
+        porcentaje = ((contadores[0] + contadores[2])/max(saltos, 1))*100
+
+        fila = [NOMBRES_PREDICTORES[bp], s, gh, ph, saltos] + list(contadores) + ["%.4f" % porcentaje]
+        print(",".join(str(valor) for valor in fila), flush=True)
+
+def frontera_pareto(puntos):
+    """Frontera de Pareto de precisión contra bits de estado
+
+    Parameters
+    ----------
+    puntos : lista de tuplas
+        Cada entrada es (bits, precision, ...); el resto de la tupla se conserva
+
+    Returns
+    ------
+    frontera : lista de tuplas
+        Los puntos que ningún otro supera en precisión con igual o menos bits,
+        ordenados por bits
+
+    """
+
+    frontera = []
+    for punto in sorted(puntos, key=lambda punto: (punto[0], -punto[1])):
+        if not frontera or punto[1] > frontera[-1][1]:
+            frontera.append(punto)
+    return frontera
+
+def comando_resultados(argumentos):
+    """Subcomando results
+
+    Consulta la base de resultados sin simular nada. Imprime una línea CSV
+    por simulación guardada o, con --best, solo la frontera de Pareto de
+    precisión contra bits de estado de cada trace. --budget descarta las
+    configuraciones que usan más bits.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    conexion = abrir_resultados(argumentos.db)
+
+    filas_por_trace = {}
+    for trace, bp, s, gh, ph, plegar, saltos, porcentaje, tiempo_lectura, tiempo_simulacion in conexion.execute(
+            """SELECT trace, bp, s, gh, ph, plegar, saltos, (taken_correctos + not_taken_correctos) * 100.0 / NULLIF(saltos, 0),
+            tiempo_lectura, tiempo_simulacion FROM resultados WHERE trace LIKE ? ORDER BY trace, s, bp, gh, ph""",
+            (argumentos.huella + "%",)):
+        bits = bits_de_configuracion(bp, s, gh, ph)
+        if argumentos.presupuesto is not None and bits > argumentos.presupuesto:
+            continue
+        fila = (bits, porcentaje, trace[:12], NOMBRES_PREDICTORES[bp], s, gh, ph, plegar, saltos,
+                tiempo_lectura, tiempo_simulacion)
+        filas_por_trace.setdefault(trace, []).append(fila)
+
+    print("trace,predictor,s,gh,ph,fold,branches,bits,accuracy,read_seconds,simulation_seconds")
+    for filas in filas_por_trace.values():
+        if argumentos.mejor:
+            # Las simulaciones de un trace vacío no tienen precisión
+            filas = frontera_pareto([fila for fila in filas if fila[1] is not None])
+        for bits, porcentaje, trace, tipo, s, gh, ph, plegar, saltos, tiempo_lectura, tiempo_simulacion in filas:
+            fila = [trace, tipo, s, gh, ph, plegar, saltos, bits, "" if porcentaje is None else "%.4f" % porcentaje,
+                    "" if tiempo_lectura is None else "%.3f" % tiempo_lectura,
+                    "" if tiempo_simulacion is None else "%.3f" % tiempo_simulacion]
+            print(",".join(str(valor) for valor in fila))
+
+def comando_busqueda(argumentos):
+    """Subcomando search
+
+    Explora las combinaciones de -s, -gh y -ph que caben en el presupuesto
+    de bits y emite la frontera de Pareto de precisión contra bits de estado.
+
+    Primero cada configuración se simula con los primeros --sample saltos.
+    Las que otra configuración con igual o menos bits supera por más de
+    --margin puntos porcentuales se descartan sin simular el trace completo.
+    Las restantes se simulan completas (o se toman de --db) y de ellas se
+    calcula la frontera.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    configuraciones = [configuracion for configuracion in
+                       configuraciones_barrido(argumentos.bp, argumentos.s, argumentos.gh, argumentos.ph, argumentos.plegar)
+                       if bits_de_configuracion(*configuracion[:4]) <= argumentos.presupuesto]
+    if not configuraciones:
+        print("Ninguna configuración cabe en " + str(argumentos.presupuesto) + " bits.", file=sys.stderr)
+        sys.exit(1)
+
+    datos = leer_entrada(argumentos.trace)
+
+    conexion = None
+    if argumentos.db is not None:
+        conexion = abrir_resultados(argumentos.db)
+        huella = huella_trace(datos)
+
+    inicio = time.perf_counter()
+    ids_pcs, tabla_pcs, resultados = decodificar_traces(datos, argumentos.trace)
+    tiempo_lectura = time.perf_counter() - inicio
+
+    muestra = min(argumentos.muestra, len(resultados))
+    pcs_por_s = {}
+
+    # Estimación de la precisión con los primeros saltos del trace
+    estimaciones = []
+    for configuracion in configuraciones:
+        bp, s, gh, ph, plegar = configuracion
+        if s not in pcs_por_s:
+            pcs_por_s[s] = recortar_pcs(ids_pcs, tabla_pcs, s)
+
+        _, _, contadores = simular(crear_predictor(s, bp, gh, ph, plegar), pcs_por_s[s][:muestra], resultados[:muestra], 0)
+        porcentaje = ((contadores[0] + contadores[2])/max(muestra, 1))*100
+        estimaciones.append((bits_de_configuracion(bp, s, gh, ph), porcentaje, configuracion))
+
+    # Se descartan las configuraciones claramente dominadas. Al recorrer por bits crecientes,
+    # mejor es la mayor precisión estimada con igual o menos bits.
+    sobrevivientes = []
+    mejor = None
+    for bits, porcentaje, configuracion in sorted(estimaciones, key=lambda estimacion: (estimacion[0], -estimacion[1])):
+        if mejor is None or mejor - porcentaje <= argumentos.margen:
+            sobrevivientes.append((bits, porcentaje, configuracion))
+        mejor = porcentaje if mejor is None else max(mejor, porcentaje)
+
+    # Simulación completa de las configuraciones que sobrevivieron
+    puntos = []
+    guardadas = 0
+    for bits, estimado, configuracion in sobrevivientes:
+        bp, s, gh, ph, plegar = configuracion
+
+        guardado = None
+        if conexion is not None:
+            guardado = buscar_resultado(conexion, huella, configuracion)
+
+        if guardado is not None:
+            guardadas += 1
+            contadores = guardado[1:]
+        else:
+            inicio = time.perf_counter()
+            _, _, contadores = simular(crear_predictor(s, bp, gh, ph, plegar), pcs_por_s[s], resultados, 0)
+            tiempo_simulacion = time.perf_counter() - inicio
+
+            if conexion is not None:
+                guardar_resultado(conexion, huella, configuracion, len(resultados), contadores,
+                                  (tiempo_lectura, tiempo_simulacion))
+
+        porcentaje = ((contadores[0] + contadores[2])/max(len(resultados), 1))*100
+        puntos.append((bits, porcentaje, estimado, configuracion))
+
+    print("predictor,s,gh,ph,fold,bits,estimated_accuracy,accuracy")
+    for bits, porcentaje, estimado, (bp, s, gh, ph, plegar) in frontera_pareto(puntos):
+        fila = [NOMBRES_PREDICTORES[bp], s, gh, ph, int(plegar), bits, "%.4f" % estimado, "%.4f" % porcentaje]
+        print(",".join(str(valor) for valor in fila))
+
+    print("Configurations within budget: " + str(len(configuraciones)) + ", pruned: "
+          + str(len(configuraciones) - len(sobrevivientes)) + ", fully simulated: "
+          + str(len(sobrevivientes) - guardadas) + ", from store: " + str(guardadas), file=sys.stderr)
+
+def comando_muestreo(argumentos):
+    """Subcomando sample
+
+    Estima la precisión de un predictor simulando solo algunas muestras del
+    trace e imprime el intervalo de confianza y la aceleración obtenida. Con
+    --validate también simula el trace completo para comparar; con --db esa
+    simulación completa se toma de la base si ya estaba o se guarda en ella.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    s, bp, gh, ph = argumentos.s, argumentos.bp, argumentos.gh, argumentos.ph
+
+    datos = leer_entrada(argumentos.trace)
+
+    inicio = time.perf_counter()
+    pcs, resultados, _, _ = procesador_traces(s, argumentos.trace, datos)
+    tiempo_lectura = time.perf_counter() - inicio
+
+    inicios = inicios_muestras(len(resultados), argumentos.muestras, argumentos.tamano,
+                               argumentos.calentamiento, argumentos.aleatorio, argumentos.semilla)
+    if inicios is None:
+        print("El trace tiene " + str(len(resultados)) + " saltos, muy pocos para " + str(argumentos.muestras)
+              + " muestras de " + str(argumentos.calentamiento) + " + " + str(argumentos.tamano) + " saltos.",
+              file=sys.stderr)
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    precisiones, simulados = simular_muestreo(crear_predictor(s, bp, gh, ph, argumentos.plegar), pcs, resultados,
+                                              inicios, argumentos.tamano, argumentos.calentamiento)
+    tiempo_muestreo = time.perf_counter() - inicio
+
+    media, margen = intervalo_confianza(precisiones, argumentos.confianza)
+
+    informacion = """    ---------------------------------------------------------------------
+    Sampled simulation
+    ---------------------------------------------------------------------
+    Branch prediction type:\t\t\t\t""" + NOMBRES_PREDICTORES[bp] + """
+    BHT size (entries):\t\t\t\t\t""" + str(pow(2, s)) + """
+    Global history register size:\t\t\t""" + str(gh) + """
+    Private history register size:\t\t\t""" + str(ph) + """
+    Samples (""" + ("random" if argumentos.aleatorio else "periodic") + """):\t\t\t\t""" + str(len(inicios)) + " x " + str(argumentos.tamano) + """
+    Warmup per sample:\t\t\t\t\t""" + str(argumentos.calentamiento) + """
+    Simulated branches:\t\t\t\t\t""" + str(simulados) + " of " + str(len(resultados)) + """
+    ---------------------------------------------------------------------
+    Estimated percentage of correct predictions\t""" + "%.4f" % media + "% ± " + "%.4f" % margen + """
+    Confidence interval (""" + "%g" % (argumentos.confianza*100) + """%):\t\t\t\t[""" + "%.4f" % (media - margen) + ", " + "%.4f" % (media + margen) + """]
+    Estimated speedup:\t\t\t\t\t""" + "%.1f" % (len(resultados)/simulados) + """x
+    Sampled simulation time (s):\t\t\t""" + "%.3f" % tiempo_muestreo + """
+    ---------------------------------------------------------------------"""
+    print(informacion)
+
+    if argumentos.validar:
+        configuracion = normalizar_configuracion(bp, s, gh, ph, argumentos.plegar)
+
+        guardado = None
+        if argumentos.db is not None:
+            conexion = abrir_resultados(argumentos.db)
+            huella = huella_trace(datos)
+            guardado = buscar_resultado(conexion, huella, configuracion)
+
+        if guardado is not None:
+            contadores = guardado[1:]
+            tiempo_completo = None
+        else:
+            inicio = time.perf_counter()
+            _, _, contadores = simular(crear_predictor(s, bp, gh, ph, argumentos.plegar), pcs, resultados, 0)
+            tiempo_completo = time.perf_counter() - inicio
+
+            if argumentos.db is not None:
+                guardar_resultado(conexion, huella, configuracion, len(resultados), contadores,
+                                  (tiempo_lectura, tiempo_completo))
+
+        # Si la simulación completa venía de la base no hay tiempo con el cual comparar
+        if tiempo_completo is None:
+            tiempos = """    Full simulation time (s):\t\t\tfrom store
+    Measured speedup:\t\t\t\t\tn/a"""
+        else:
+            tiempos = """    Full simulation time (s):\t\t\t""" + "%.3f" % tiempo_completo + """
+    Measured speedup:\t\t\t\t\t""" + "%.1f" % (tiempo_completo/max(tiempo_muestreo, 1e-9)) + "x"
+
+        exacto = ((contadores[0] + contadores[2])/len(resultados))*100
+        dentro = abs(exacto - media) <= margen
+
+        validacion = """    Exact percentage of correct predictions\t\t""" + "%.4f" % exacto + """%
+    Estimation error (points):\t\t\t""" + "%.4f" % (media - exacto) + """
+    Exact value inside the interval:\t\t\t""" + ("yes" if dentro else "no") + """
+""" + tiempos + """
+    ---------------------------------------------------------------------"""
+        print(validacion)
+
+def comando_telemetria(argumentos):
+    """Subcomando telemetry
+
+    Convierte un archivo de telemetría a CSV, con una línea por ventana.
+    Se puede usar mientras la simulación que lo escribe sigue corriendo.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    ventana, columnas = leer_telemetria(argumentos.archivo)
+    es_torneo = "usa_gshare" in columnas
+
+    print("end_branch,branches,accuracy,taken_mispredict_rate,not_taken_mispredict_rate,gshare_share")
+
+    fin = 0
+    for i in range(len(columnas["saltos"])):
+        saltos = columnas["saltos"][i]
+        taken = columnas["taken_correctos"][i] + columnas["taken_incorrectos"][i]
+        not_taken = columnas["not_taken_correctos"][i] + columnas["not_taken_incorrectos"][i]
+        fin += saltos
+
+        precision = (columnas["taken_correctos"][i] + columnas["not_taken_correctos"][i])/saltos*100
+        fallos_taken = columnas["taken_incorrectos"][i]/taken*100 if taken else 0.0
+        fallos_not_taken = columnas["not_taken_incorrectos"][i]/not_taken*100 if not_taken else 0.0
+        gshare = "%.4f" % (columnas["usa_gshare"][i]/saltos*100) if es_torneo else ""
+
+        fila = [fin, saltos, "%.4f" % precision, "%.4f" % fallos_taken, "%.4f" % fallos_not_taken, gshare]
+        print(",".join(str(valor) for valor in fila))
+
+def comando_convertir(argumentos):
+    """Subcomando convert
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    ids_pcs, tabla_pcs, resultados = decodificar_traces(leer_entrada(argumentos.entrada), argumentos.entrada)
+    convertir_traces(ids_pcs, tabla_pcs, resultados, argumentos.salida)
+    print("Se convirtieron " + str(len(resultados)) + " saltos a " + argumentos.salida)
+
+def comando_estadisticas(argumentos):
+    """Subcomando stats
+
+    Imprime un resumen de los traces y los saltos estáticos más ejecutados.
+    Opcionalmente guarda las estadísticas de todos los PCs en un CSV.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    ids_pcs, tabla_pcs, resultados = decodificar_traces(leer_entrada(argumentos.trace), argumentos.trace)
+    estadisticas = estadisticas_traces(ids_pcs, tabla_pcs, resultados)
+
+    saltos = estadisticas["saltos"]
+    tasa_tomados = estadisticas["tomados"]/saltos*100 if saltos else 0.0
+    por_pc = sorted(estadisticas["por_pc"], key=lambda datos: datos["ejecuciones"], reverse=True)
+
+    informacion = """    ---------------------------------------------------------------------
+    Trace statistics
+    ---------------------------------------------------------------------
+    Number of branches:\t\t\t\t\t""" + str(saltos) + """
+    Number of static branches:\t\t\t\t""" + str(estadisticas["saltos_estaticos"]) + """
+    Percentage of taken branches:\t\t\t""" + "%.4f" % tasa_tomados + "%" + """
+    ---------------------------------------------------------------------
+    PC\t\tExecutions\tTaken rate\tBias\tRuns\tLongest run
+    ---------------------------------------------------------------------"""
+    print(informacion)
+
+    for datos in por_pc[:argumentos.top]:
+        print("    " + str(datos["pc"]) + "\t" + str(datos["ejecuciones"]) + "\t\t" + "%.4f" % datos["tasa_tomados"]
+              + "\t\t" + "%.4f" % datos["sesgo"] + "\t" + str(datos["rachas"]) + "\t" + str(datos["racha_maxima"]))
+
+    if argumentos.csv is not None:
+        with open(argumentos.csv, 'w') as file:
+            file.write("pc,executions,taken,taken_rate,bias,runs,longest_run\n")
+            for datos in por_pc:
+                file.write(",".join(str(datos[campo]) for campo in
+                                    ("pc", "ejecuciones", "tomados", "tasa_tomados", "sesgo", "rachas", "racha_maxima")) + "\n")
+
+def comando_bench(argumentos):
+    """Subcomando bench
+
+    Mide el tiempo de arranque en frío del programa (intérprete, módulo y
+    argparse) ejecutándolo varias veces y compara la mediana con el objetivo.
+    Termina con código 1 si el objetivo no se cumple.
+
+    Parameters
+    ----------
+    argumentos : argparse.Namespace
+        Argumentos validados por procesador_argumentos
+
+    """
+
+    import subprocess
+
+    comando = [sys.executable, __file__, "simulate", "--help"]
+
+    tiempos = []
+    for i in range(argumentos.repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run(comando, stdout=subprocess.DEVNULL, check=True)
+        tiempos.append((time.perf_counter() - inicio)*1000)
+
+    tiempos.sort()
+    mediana = tiempos[len(tiempos)//2]
+    cumple = mediana <= argumentos.objetivo_ms
+
+    print("Cold start (ms): min " + "%.1f" % tiempos[0] + ", median " + "%.1f" % mediana
+          + ", max " + "%.1f" % tiempos[-1] + ", target " + str(argumentos.objetivo_ms)
+          + (" -> OK" if cumple else " -> FAIL"))
+
+    if not cumple:
+        sys.exit(1)
+
+def main(argv=None):
+    """Función principal del programa
+
+    Procesa los argumentos y llama la función del subcomando elegido.
+    Sin subcomando se ejecuta simulate.
+
+    Parameters
+    ----------
+    argv : lista de strings
+        Argumentos a procesar, por defecto sys.argv[1:]
+
+    """
 
-    # Se probaron varias pruebas incluyendo las adjuntas en el enunciado de la tarea,
-    # el tiempo maximo en mí máquina (Ryzen 1600X + 16 GB RAM) fue de la simulacion 
-    # del predictor por torneo que ronda los 80 s.
-    # print("El tiempo total de ejecución fue de: " + str(c.seconds) + " segundos.")
+    argumentos = procesador_argumentos(argv)
+    argumentos.funcion(argumentos)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()